@@ -1,15 +1,49 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from threading import Thread
+
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from src.db import ensure_view, get_video_list
 from src.routes import router
-from src.settings import VIDEOS_DIR
+from src.settings import SERVE_VIDEOS, VIDEOS_DIR
+
+
+def _warm_video_caches() -> None:
+    """
+    Eagerly load every video's box data so the first click on a video
+    doesn't pay the parquet-decode latency.
+    """
+    for item in get_video_list():
+        try:
+            ensure_view(item["video_id"])
+        except Exception as e:
+            print(f"[APP] Warmup failed for {item['video_id']}: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    Thread(target=_warm_video_caches, name="video-warmup", daemon=True).start()
+    yield
+
+
+# orjson encodes the simple list/dict payloads served here in C instead
+# of walking them in pure Python.
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
-app = FastAPI()
+# The index HTML and the timeline/boxes JSON compress well (>5x); tiny
+# payloads like hit responses stay uncompressed via minimum_size.
+app.add_middleware(GZipMiddleware, minimum_size=500)
 
-# Static serving: MP4s use Range requests (Starlette FileResponse)
-app.mount("/videos", StaticFiles(directory=str(VIDEOS_DIR)), name="videos")
+# Static serving: MP4s use Range requests (Starlette FileResponse).
+# Dev convenience only - in production nginx serves /videos/ with
+# sendfile and this mount is disabled via SERVE_VIDEOS=0.
+if SERVE_VIDEOS:
+    app.mount("/videos", StaticFiles(directory=str(VIDEOS_DIR)), name="videos")
 
 # API + frontend routes
 app.include_router(router)
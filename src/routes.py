@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Query
+import asyncio
+
+from fastapi import APIRouter, Query, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Tuple
 
 from src.db import (
     ensure_view,
     get_video_list,
+    peek_view,
     query_boxes,
+    query_boxes_bin,
     query_boxes_range,
     query_next_hit,
     query_next_hit_with_blacklist,
@@ -22,6 +27,18 @@ from src.templates import render_index
 router = APIRouter()
 
 
+async def ensure_video(video_id: str) -> str:
+    """
+    Resolve the video's table name. Warm videos cost a single dict
+    lookup; only the first request per video takes the threadpool hop
+    for the blocking parquet load.
+    """
+    view = peek_view(video_id)
+    if view is None:
+        view = await asyncio.to_thread(ensure_view, video_id)
+    return view
+
+
 class LogItem(BaseModel):
     rawTime: float
     type: str
@@ -41,9 +58,9 @@ def index():
 
 
 @router.get("/api/videos")
-def api_videos():
+async def api_videos():
     # 비디오 목록을 줄 때, 각 비디오의 완료 여부도 같이 주면 좋음
-    videos = get_video_list()
+    videos = await asyncio.to_thread(get_video_list)
     # (선택사항) 리스트 로딩 시 완료 여부를 체크해서 넣어줄 수도 있음
     # 성능을 위해 여기서는 단순 목록만 반환하고,
     # 개별 선택 시 로그를 로드하는 방식으로 진행
@@ -76,45 +93,60 @@ def api_save_logs(video_id: str, payload: VideoLogData):
 
 
 @router.get("/api/videos/{video_id}/boxes")
-def api_boxes(video_id: str, frame: int = Query(..., ge=0)):
-    view = ensure_view(video_id)
-    return query_boxes(view, frame)
+async def api_boxes(video_id: str, frame: int = Query(..., ge=0)):
+    await ensure_video(video_id)
+    # Returning a Response directly skips FastAPI's jsonable_encoder pass
+    # and serializes via orjson's C encoder.
+    return ORJSONResponse(query_boxes(video_id, frame))
+
+
+@router.get("/api/videos/{video_id}/boxes_bin")
+async def api_boxes_bin(video_id: str, frame: int = Query(..., ge=0)):
+    await ensure_video(video_id)
+    # Packed float32 (x, y, width, height, box_index) per box; no JSON
+    # encode on the server and no JSON.parse on the client.
+    return Response(
+        content=query_boxes_bin(video_id, frame),
+        media_type="application/octet-stream",
+    )
 
 
 @router.get("/api/videos/{video_id}/boxes_range")
-def api_boxes_range(
+async def api_boxes_range(
     video_id: str,
     start_frame: int = Query(..., ge=0),
     end_frame: int = Query(..., ge=0),
 ):
-    view = ensure_view(video_id)
-    boxes = query_boxes_range(view, start_frame, end_frame)
-    return {"boxes": boxes, "start_frame": start_frame, "end_frame": end_frame}
+    await ensure_video(video_id)
+    boxes = query_boxes_range(video_id, start_frame, end_frame)
+    return ORJSONResponse(
+        {"boxes": boxes, "start_frame": start_frame, "end_frame": end_frame}
+    )
 
 
 @router.get("/api/videos/{video_id}/timeline")
-def api_timeline(video_id: str, bin_sec: int = Query(1, ge=1, le=60)):
-    view = ensure_view(video_id)
-    counts = query_timeline(view, bin_sec)
-    return {"bin_sec": bin_sec, "counts": counts}
+async def api_timeline(video_id: str, bin_sec: int = Query(1, ge=1, le=60)):
+    await ensure_video(video_id)
+    counts = await asyncio.to_thread(query_timeline, video_id, bin_sec)
+    return ORJSONResponse({"bin_sec": bin_sec, "counts": counts})
 
 
 @router.get("/api/videos/{video_id}/next_hit")
-def api_next_hit(video_id: str, frame: int = Query(..., ge=0)):
-    view = ensure_view(video_id)
-    next_frame = query_next_hit(view, frame)
+async def api_next_hit(video_id: str, frame: int = Query(..., ge=0)):
+    await ensure_video(video_id)
+    next_frame = query_next_hit(video_id, frame)
     return {"frame": next_frame}
 
 
 @router.get("/api/videos/{video_id}/next_hit_with_blacklist")
-def api_next_hit_with_blacklist(
+async def api_next_hit_with_blacklist(
     video_id: str,
     frame: int = Query(..., ge=0),
     blacklist: str = Query(""),
 ):
-    view = ensure_view(video_id)
+    view = await ensure_video(video_id)
     if not blacklist:
-        next_frame = query_next_hit(view, frame)
+        next_frame = query_next_hit(video_id, frame)
         return {"frame": next_frame}
     # 블랙리스트 파싱
     blacklist_boxes: List[Tuple[int, int, int, int]] = []
@@ -124,26 +156,28 @@ def api_next_hit_with_blacklist(
             blacklist_boxes.append((x1, y1, x2, y2))
         except Exception:
             continue
-    next_frame = query_next_hit_with_blacklist(view, frame, blacklist_boxes)
+    next_frame = await asyncio.to_thread(
+        query_next_hit_with_blacklist, view, frame, blacklist_boxes
+    )
     return {"frame": next_frame}
 
 
 @router.get("/api/videos/{video_id}/prev_hit")
-def api_prev_hit(video_id: str, frame: int = Query(..., ge=0)):
-    view = ensure_view(video_id)
-    prev_frame = query_prev_hit(view, frame)
+async def api_prev_hit(video_id: str, frame: int = Query(..., ge=0)):
+    await ensure_video(video_id)
+    prev_frame = query_prev_hit(video_id, frame)
     return {"frame": prev_frame}
 
 
 @router.get("/api/videos/{video_id}/prev_hit_with_blacklist")
-def api_prev_hit_with_blacklist(
+async def api_prev_hit_with_blacklist(
     video_id: str,
     frame: int = Query(..., ge=0),
     blacklist: str = Query(""),
 ):
-    view = ensure_view(video_id)
+    view = await ensure_video(video_id)
     if not blacklist:
-        prev_frame = query_prev_hit(view, frame)
+        prev_frame = query_prev_hit(video_id, frame)
         return {"frame": prev_frame}
     # 블랙리스트 파싱
     blacklist_boxes: List[Tuple[int, int, int, int]] = []
@@ -153,5 +187,7 @@ def api_prev_hit_with_blacklist(
             blacklist_boxes.append((x1, y1, x2, y2))
         except Exception:
             continue
-    prev_frame = query_prev_hit_with_blacklist(view, frame, blacklist_boxes)
+    prev_frame = await asyncio.to_thread(
+        query_prev_hit_with_blacklist, view, frame, blacklist_boxes
+    )
     return {"frame": prev_frame}
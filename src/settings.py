@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 # Application-wide constants and resolved paths
 FPS: float = 24.0
+
+# Serve MP4s from this process (dev default). In production set
+# SERVE_VIDEOS=0 and let nginx handle /videos/ with sendfile - Range
+# requests for video streaming are kernel work, not Python work.
+# See README for the nginx block.
+SERVE_VIDEOS: bool = os.environ.get("SERVE_VIDEOS", "1") != "0"
 # src/ -> project root
 BASE = Path(__file__).resolve().parent.parent
 VIDEOS_DIR = BASE / "data" / "videos"
 BOXES_DIR = BASE / "data" / "boxes"
 LOG_DIR = BASE / "data" / "logs"
+DB_PATH = BASE / "data" / "boxes.duckdb"
 TEMPLATES_DIR = BASE / "templates"
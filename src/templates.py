@@ -8,12 +8,14 @@ from src.settings import FPS, TEMPLATES_DIR
 
 
 @lru_cache(maxsize=1)
-def _index_template() -> str:
-    return (TEMPLATES_DIR / "index.html").read_text(encoding="utf-8")
+def _rendered_index() -> bytes:
+    # FPS is a settings-time constant, so substitute once and keep the
+    # encoded bytes; serving the page is then a plain buffer hand-off.
+    html = (TEMPLATES_DIR / "index.html").read_text(encoding="utf-8")
+    # Replace any whitespace variation inside the template braces, e.g. "{{FPS}}", "{{ FPS }}"
+    html = re.sub(r'\{\{\s*FPS\s*\}\}', str(FPS), html)
+    return html.encode("utf-8")
 
 
 def render_index() -> HTMLResponse:
-    html = _index_template()
-    # Replace any whitespace variation inside the template braces, e.g. "{{FPS}}", "{{ FPS }}"
-    html = re.sub(r'\{\{\s*FPS\s*\}\}', str(FPS), html)
-    return HTMLResponse(html)
+    return HTMLResponse(_rendered_index())